@@ -172,18 +172,24 @@ impl Stream for Monitor {
     type Item = Result<udev::Event>;
 
     fn poll_next(mut self: Pin<&mut Self>, cx: &mut Context<'_>) -> Poll<Option<Self::Item>> {
-        match self.fd.poll_read_ready_mut(cx) {
-            Poll::Ready(Ok(mut ready_guard)) => {
-                ready_guard.clear_ready();
-                return Poll::Ready(ready_guard.get_inner_mut().next().map(Ok));
-            }
+        loop {
+            match self.fd.poll_read_ready_mut(cx) {
+                Poll::Ready(Ok(mut ready_guard)) => {
+                    // Keep the socket ready until all queued events have been received
+                    if let Some(event) = ready_guard.get_inner_mut().next() {
+                        return Poll::Ready(Some(Ok(event)));
+                    }
 
-            Poll::Ready(Err(err)) => {
-                return Poll::Ready(Some(Err(err.into())));
-            }
+                    ready_guard.clear_ready();
+                }
 
-            Poll::Pending => {
-                return Poll::Pending;
+                Poll::Ready(Err(err)) => {
+                    return Poll::Ready(Some(Err(err.into())));
+                }
+
+                Poll::Pending => {
+                    return Poll::Pending;
+                }
             }
         }
     }
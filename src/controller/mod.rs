@@ -2,6 +2,7 @@ use std::collections::hash_map::DefaultHasher;
 use std::future::Future;
 use std::hash::Hasher;
 use std::ops::Deref;
+use std::os::unix::fs::OpenOptionsExt;
 use std::path::{Path, PathBuf};
 use std::task::Poll;
 use std::time::{Duration, Instant};
@@ -10,10 +11,10 @@ use anyhow::Result;
 use cgmath::{ElementWise, Zero};
 use futures::TryFuture;
 use serde::Serialize;
-use tokio::fs::{File, OpenOptions};
+use tokio::io::unix::AsyncFd;
 use tracing::instrument;
 
-use proto::{Get, Set};
+use proto::{DeviceFile, Get, Set};
 pub use proto::Address;
 use proto::zcm1::{GetAddress, GetCalibration, GetCalibrationInner, GetInput, SetLED};
 
@@ -36,6 +37,33 @@ pub struct Buttons {
     pub trigger: (bool, f32),
 }
 
+impl Buttons {
+    const SELECT: u32 = 1 << 0;
+    const START: u32 = 1 << 3;
+    const TRIANGLE: u32 = 1 << 12;
+    const CIRCLE: u32 = 1 << 13;
+    const CROSS: u32 = 1 << 14;
+    const SQUARE: u32 = 1 << 15;
+    const LOGO: u32 = 1 << 16;
+    const SWOOSH: u32 = 1 << 19;
+    const TRIGGER: u32 = 1 << 20;
+
+    /// Decodes the buttons from the bitmask of an input report
+    fn from_mask(mask: u32, trigger: f32) -> Self {
+        return Self {
+            square: mask & Self::SQUARE != 0,
+            triangle: mask & Self::TRIANGLE != 0,
+            cross: mask & Self::CROSS != 0,
+            circle: mask & Self::CIRCLE != 0,
+            start: mask & Self::START != 0,
+            select: mask & Self::SELECT != 0,
+            logo: mask & Self::LOGO != 0,
+            swoosh: mask & Self::SWOOSH != 0,
+            trigger: (mask & Self::TRIGGER != 0, trigger),
+        };
+    }
+}
+
 struct Limiter<T> {
     value: T,
     dirty: bool,
@@ -64,18 +92,23 @@ impl<T> Limiter<T>
         }
     }
 
-    pub(self) fn update(&mut self) -> Option<&T> {
-        let now = Instant::now();
+    /// Returns the value if it must be sent. The value stays pending until marked as `sent`.
+    pub(self) fn pending(&self, now: Instant) -> Option<&T> {
+        let elapsed = now.saturating_duration_since(self.updated);
 
         // Check if value has change but rate limit will not exceed or if value needs resending
-        if (now.duration_since(self.updated) >= Self::MIN_UPDATE && self.dirty) ||
-            now.duration_since(self.updated) >= Self::MAX_UPDATE {
-            self.updated = now;
+        if (elapsed >= Self::MIN_UPDATE && self.dirty) || elapsed >= Self::MAX_UPDATE {
             return Some(&self.value);
         }
 
         return None;
     }
+
+    /// Marks the current value as successfully sent.
+    pub(self) fn sent(&mut self, now: Instant) {
+        self.updated = now;
+        self.dirty = false;
+    }
 }
 
 impl<T> Deref for Limiter<T> {
@@ -212,11 +245,14 @@ pub struct Controller {
     path: PathBuf,
 
     /// The device file used for communication
-    file: File,
+    file: DeviceFile,
 
     /// The bluetooth address of the controller
     address: Address,
 
+    /// Unique id derived from the address
+    id: u64,
+
     /// Calibration data received from the controller
     calibration: Calibration,
 
@@ -227,17 +263,21 @@ pub struct Controller {
 }
 
 impl Controller {
+    /// Maximum time to wait for an input report on each update
+    const REPORT_INTERVAL: Duration = Duration::from_millis(4);
+
     pub async fn new(path: impl AsRef<Path>) -> Result<Self> {
         let path = path.as_ref().to_path_buf();
 
-        let mut file = OpenOptions::new()
+        let file = std::fs::OpenOptions::new()
             .read(true)
             .write(true)
-            .open(&path)
-            .await?;
+            .custom_flags(nix::libc::O_NONBLOCK)
+            .open(&path)?;
+        let mut file = AsyncFd::new(file)?;
 
         // Delay a bit for things to settle
-        tokio::time::sleep(Duration::from_millis(100));
+        tokio::time::sleep(Duration::from_millis(100)).await;
 
         // Get device address
         let address = GetAddress::get(&mut file).await?
@@ -250,10 +290,16 @@ impl Controller {
             &GetCalibration::get(&mut file).await?,
         ])?.into();
 
+        // Derive the id once as it is used for every player lookup
+        let mut hasher = DefaultHasher::new();
+        hasher.write(address.as_ref());
+        let id = hasher.finish();
+
         return Ok(Self {
             path,
             file,
             address,
+            id,
             calibration,
             input: Default::default(),
             battery: Battery::Unknown,
@@ -275,25 +321,38 @@ impl Controller {
 
     /// A unique id of that controller
     pub fn id(&self) -> u64 {
-        let mut hasher = DefaultHasher::new();
-        hasher.write(self.address.as_ref());
-        return hasher.finish();
+        return self.id;
     }
 
     #[instrument(level = "trace", name = "Controller::update", skip(self))]
-    pub async fn update(&mut self) -> Result<()> {
-        // Send updates if required
-        if let Some(feedback) = self.feedback.update() {
-            let led = SetLED::from(feedback);
-            SetLED::set(&mut self.file, led).await?;
-        }
+    pub async fn update(&mut self, now: Instant) -> Result<()> {
+        // Wait for an input report but not longer than the controllers report interval and drain all
+        // other reports available afterwards. Sensor data is taken from the most recent report but
+        // buttons are collected from all of them to not miss short presses.
+        let deadline = tokio::time::Instant::from_std(now) + Self::REPORT_INTERVAL;
+
+        let mut latest = None;
+        let mut pressed = 0u32;
+        loop {
+            let input = if latest.is_none() {
+                match tokio::time::timeout_at(deadline, GetInput::get(&mut self.file)).await {
+                    Ok(input) => input?,
+                    Err(_) => break,
+                }
+            } else {
+                match futures::poll!(GetInput::get(&mut self.file)) {
+                    Poll::Ready(input) => input?,
+                    Poll::Pending => break,
+                }
+            };
 
-        // Read input report from device if available
-        // TODO: Revisit this: Would it be better to read at least one report?
-        // TODO: This effectively disables the timeout
-        if let Poll::Ready(input) = futures::poll!(GetInput::get(&mut self.file)) {
-            let input = input?;
+            let buttons: u32 = input.buttons.into();
+            pressed |= buttons;
 
+            latest = Some(input);
+        }
+
+        if let Some(input) = latest {
             fn avg(v1: cgmath::Vector3<f32>, v2: cgmath::Vector3<f32>) -> cgmath::Vector3<f32> {
                 return (v1 + v2) / 2.0;
             }
@@ -305,23 +364,9 @@ impl Controller {
             self.input.gyroscope = avg(input.gyro_1.into(), input.gyro_2.into())
                 .mul_element_wise(self.calibration.gyroscope);
 
-            fn bit(buttons: impl Into<u32>, bit: usize) -> bool {
-                return buttons.into() & (1 << bit) != 0;
-            }
+            let trigger = ((input.trigger_1 as f32) / (0xFF as f32) + (input.trigger_2 as f32) / (0xFF as f32)) / 2.0;
 
-            let trigger = ((input.trigger_1 as f32) / (0xFF as f32) + (input.trigger_1 as f32) / (0xFF as f32)) / 2.0;
-
-            self.input.buttons = Buttons {
-                square: bit(input.buttons, 15),
-                triangle: bit(input.buttons, 12),
-                cross: bit(input.buttons, 14),
-                circle: bit(input.buttons, 13),
-                start: bit(input.buttons, 3),
-                select: bit(input.buttons, 0),
-                logo: bit(input.buttons, 16),
-                swoosh: bit(input.buttons, 19),
-                trigger: (bit(input.buttons, 20), trigger),
-            };
+            self.input.buttons = Buttons::from_mask(pressed, trigger);
 
             self.battery = match input.battery {
                 0x00 => Battery::Draining(0.0),
@@ -338,6 +383,20 @@ impl Controller {
         return Ok(());
     }
 
+    #[instrument(level = "trace", name = "Controller::flush", skip(self))]
+    pub async fn flush(&mut self, now: Instant) -> Result<()> {
+        // Send updates if required
+        if let Some(feedback) = self.feedback.pending(now) {
+            let led = SetLED::from(feedback);
+            SetLED::set(&mut self.file, led).await?;
+
+            // Only mark as sent after the write succeeded so failed or cancelled writes are retried
+            self.feedback.sent(now);
+        }
+
+        return Ok(());
+    }
+
     pub fn input(&self) -> &Input {
         return &self.input;
     }
@@ -349,4 +408,96 @@ impl Controller {
     pub fn feedback(&mut self, feedback: Feedback) {
         self.feedback.set(feedback);
     }
-}
\ No newline at end of file
+}
+
+#[cfg(test)]
+mod test {
+    use super::*;
+
+    #[test]
+    fn test_limiter_sends_changes_once() {
+        let mut limiter = Limiter::new(1u8);
+
+        let start = limiter.updated;
+        let step = Limiter::<u8>::MIN_UPDATE;
+
+        // Changes are rate limited
+        assert_eq!(limiter.pending(start), None);
+        assert_eq!(limiter.pending(start + step), Some(&1));
+        limiter.sent(start + step);
+
+        // Unchanged values are not resent before the refresh interval
+        assert_eq!(limiter.pending(start + step * 2), None);
+
+        limiter.set(1);
+        assert_eq!(limiter.pending(start + step * 3), None);
+
+        limiter.set(2);
+        assert_eq!(limiter.pending(start + step * 4), Some(&2));
+        limiter.sent(start + step * 4);
+        assert_eq!(limiter.pending(start + step * 5), None);
+
+        // Values are resent after the refresh interval
+        assert_eq!(limiter.pending(start + step * 4 + Limiter::<u8>::MAX_UPDATE), Some(&2));
+    }
+
+    #[test]
+    fn test_limiter_retries_failed_send() {
+        let mut limiter = Limiter::new(1u8);
+
+        let start = limiter.updated;
+        let step = Limiter::<u8>::MIN_UPDATE;
+
+        limiter.set(2);
+        assert_eq!(limiter.pending(start + step), Some(&2));
+
+        // Sending failed - value must still be pending
+        assert_eq!(limiter.pending(start + step * 2), Some(&2));
+        limiter.sent(start + step * 2);
+        assert_eq!(limiter.pending(start + step * 3), None);
+    }
+
+    fn pressed(buttons: &Buttons) -> Vec<&'static str> {
+        return [
+            (buttons.square, "square"),
+            (buttons.triangle, "triangle"),
+            (buttons.cross, "cross"),
+            (buttons.circle, "circle"),
+            (buttons.start, "start"),
+            (buttons.select, "select"),
+            (buttons.logo, "logo"),
+            (buttons.swoosh, "swoosh"),
+            (buttons.trigger.0, "trigger"),
+        ].into_iter()
+            .filter(|(pressed, _)| *pressed)
+            .map(|(_, name)| name)
+            .collect();
+    }
+
+    #[test]
+    fn test_buttons_from_mask_single() {
+        // Bit numbers as used by the controller report
+        for (bit, name) in [
+            (15, "square"),
+            (12, "triangle"),
+            (14, "cross"),
+            (13, "circle"),
+            (3, "start"),
+            (0, "select"),
+            (16, "logo"),
+            (19, "swoosh"),
+            (20, "trigger"),
+        ] {
+            assert_eq!(pressed(&Buttons::from_mask(1 << bit, 0.0)), vec![name], "bit {}", bit);
+        }
+
+        assert!(pressed(&Buttons::from_mask(0, 0.0)).is_empty());
+    }
+
+    #[test]
+    fn test_buttons_from_mask_chorded() {
+        let buttons = Buttons::from_mask(1 << 15 | 1 << 14 | 1 << 16 | 1 << 20, 0.5);
+        assert_eq!(pressed(&buttons), vec!["square", "cross", "logo", "trigger"]);
+        assert_eq!(buttons.trigger.1, 0.5);
+    }
+}
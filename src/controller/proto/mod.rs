@@ -1,21 +1,29 @@
+use std::fs::File;
+use std::io::{Read, Write};
 use std::os::unix::prelude::AsRawFd;
 
 use anyhow::Result;
 use async_trait::async_trait;
 use packed_struct::prelude::{bits::ByteArray, PackedStruct, PackedStructSlice};
-use tokio::fs::File;
-use tokio::io::{AsyncReadExt, AsyncWriteExt};
+use tokio::io::unix::AsyncFd;
 
 pub mod zcm1;
 
+/// A non-blocking device file registered with the reactor.
+///
+/// Reports are read directly on readiness instead of dispatching each read to the blocking thread
+/// pool. Writes and feature report ioctls still go to the blocking pool as hidraw ignores
+/// `O_NONBLOCK` for these.
+pub type DeviceFile = AsyncFd<File>;
+
 #[async_trait]
 pub trait Getter<R: Report> {
-    async fn get(f: &mut File) -> Result<R>;
+    async fn get(f: &mut DeviceFile) -> Result<R>;
 }
 
 #[async_trait]
 pub trait Setter<R: Report> {
-    async fn set(f: &mut File, report: R) -> Result<()>;
+    async fn set(f: &mut DeviceFile, report: R) -> Result<()>;
 }
 
 pub trait Report: PackedStruct + Sized {
@@ -30,7 +38,7 @@ pub trait Report: PackedStruct + Sized {
 pub trait Get: Report {
     type Getter: self::Getter<Self>;
 
-    async fn get(f: &mut File) -> Result<Self> {
+    async fn get(f: &mut DeviceFile) -> Result<Self> {
         return Self::Getter::get(f).await;
     }
 }
@@ -39,7 +47,7 @@ pub trait Get: Report {
 pub trait Set: Report {
     type Setter: self::Setter<Self>;
 
-    async fn set(f: &mut File, report: Self) -> Result<()> {
+    async fn set(f: &mut DeviceFile, report: Self) -> Result<()> {
         return Self::Setter::set(f, report).await;
     }
 }
@@ -48,10 +56,18 @@ pub struct Primary {}
 
 #[async_trait]
 impl<R: Report> Getter<R> for Primary {
-    async fn get(f: &mut File) -> Result<R> {
+    async fn get(f: &mut DeviceFile) -> Result<R> {
         let mut buffer = vec![0u8; R::ByteArray::len() + 1];
-        f.read_exact(&mut buffer).await?;
 
+        // Each read on a hidraw device returns a single complete report
+        let len = loop {
+            let mut ready = f.readable().await?;
+            if let Ok(result) = ready.try_io(|inner| inner.get_ref().read(&mut buffer)) {
+                break result?;
+            }
+        };
+
+        anyhow::ensure!(len == buffer.len(), "Short report: {} of {} bytes", len, buffer.len());
         assert_eq!(buffer[0], R::REPORT_ID);
 
         return Ok(R::unpack_from_slice(&buffer[1..])?);
@@ -63,12 +79,18 @@ impl<R> Setter<R> for Primary
     where
         R: Report + Send + 'static
 {
-    async fn set(f: &mut File, report: R) -> Result<()> {
+    async fn set(f: &mut DeviceFile, report: R) -> Result<()> {
         let mut data = vec![0u8; R::ByteArray::len() + 1]; // Make this static allocate
         data[0] = R::REPORT_ID;
         report.pack_to_slice(&mut data[1..])?;
 
-        f.write_all(&data).await?;
+        // Each write on a hidraw device sends a single complete report. The write blocks regardless
+        // of O_NONBLOCK (USB transfers are synchronous) and must not stall the runtime workers.
+        let mut file = f.get_ref().try_clone()?;
+        let expected = data.len();
+        let len = tokio::task::spawn_blocking(move || file.write(&data)).await??;
+
+        anyhow::ensure!(len == expected, "Short report: {} of {} bytes", len, expected);
 
         return Ok(());
     }
@@ -84,7 +106,7 @@ impl Feature {
 
 #[async_trait]
 impl<R: Report> Getter<R> for Feature {
-    async fn get(f: &mut File) -> Result<R> {
+    async fn get(f: &mut DeviceFile) -> Result<R> {
         let ioc = nix::ioc!(nix::sys::ioctl::READ | nix::sys::ioctl::WRITE,
             Self::IOC_HIDRAW_MAGIC,
             Self::IOC_HIDRAW_GET_FEATURE_REPORT,
@@ -93,9 +115,13 @@ impl<R: Report> Getter<R> for Feature {
         let mut data = vec![0u8; R::ByteArray::len() + 1]; // Make this static allocate
         data[0] = R::REPORT_ID;
 
-        nix::errno::Errno::result(unsafe {
-            nix::libc::ioctl(f.as_raw_fd(), ioc, data.as_mut_slice())
-        })?;
+        // The ioctl blocks until the controller answered and must not stall the runtime workers
+        let file = f.get_ref().try_clone()?;
+        let data = tokio::task::spawn_blocking(move || {
+            return nix::errno::Errno::result(unsafe {
+                nix::libc::ioctl(file.as_raw_fd(), ioc, data.as_mut_slice())
+            }).map(|_| data);
+        }).await??;
 
         return Ok(R::unpack_from_slice(&data[1..])?);
     }
@@ -106,7 +132,7 @@ impl<R> Setter<R> for Feature
     where
         R: Report + Send + 'static
 {
-    async fn set(f: &mut File, report: R) -> Result<()> {
+    async fn set(f: &mut DeviceFile, report: R) -> Result<()> {
         let ioc = nix::ioc!(nix::sys::ioctl::READ | nix::sys::ioctl::WRITE,
                 Self::IOC_HIDRAW_MAGIC,
                 Self::IOC_HIDRAW_SEND_FEATURE_REPORT,
@@ -116,9 +142,13 @@ impl<R> Setter<R> for Feature
         data[0] = R::REPORT_ID;
         report.pack_to_slice(&mut data[1..])?;
 
-        nix::errno::Errno::result(unsafe {
-            nix::libc::ioctl(f.as_raw_fd(), ioc, data.as_slice())
-        })?;
+        // The ioctl blocks until the controller answered and must not stall the runtime workers
+        let file = f.get_ref().try_clone()?;
+        tokio::task::spawn_blocking(move || {
+            return nix::errno::Errno::result(unsafe {
+                nix::libc::ioctl(file.as_raw_fd(), ioc, data.as_slice())
+            });
+        }).await??;
 
         return Ok(());
     }
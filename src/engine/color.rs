@@ -0,0 +1,60 @@
+use scarlet::color::RGBColor;
+
+/// Number of entries in the hue lookup table - one per degree.
+const HUE_STEPS: usize = 360;
+
+/// Fully saturated and bright colors for each degree on the hue circle.
+const HUES: [(u8, u8, u8); HUE_STEPS] = rainbow();
+
+/// Builds a table of `N` fully saturated colors evenly distributed around the hue circle.
+pub const fn rainbow<const N: usize>() -> [(u8, u8, u8); N] {
+    let mut table = [(0, 0, 0); N];
+
+    let mut i = 0;
+    while i < N {
+        // Position on the hue circle split into six sectors of 255 steps each
+        let h = i * 6 * 255 / N;
+        let rise = (h % 255) as u8;
+        let fall = 255 - rise;
+
+        table[i] = match h / 255 {
+            0 => (255, rise, 0),
+            1 => (fall, 255, 0),
+            2 => (0, 255, rise),
+            3 => (0, fall, 255),
+            4 => (rise, 0, 255),
+            _ => (255, 0, fall),
+        };
+
+        i += 1;
+    }
+
+    return table;
+}
+
+/// Returns the fully saturated and bright color for the given hue, where a hue of `1.0` is a full
+/// rotation. Approximately converting `HSVColor { h: hue * 360.0, s: 1.0, v: 1.0 }` using a lookup
+/// table - hues are rounded down to whole degrees and channels are truncated to integers.
+pub fn hue(hue: f64) -> RGBColor {
+    let i = (hue.rem_euclid(1.0) * HUE_STEPS as f64) as usize % HUE_STEPS;
+    return RGBColor::from(HUES[i]);
+}
+
+#[cfg(test)]
+mod test {
+    use super::*;
+
+    #[test]
+    fn test_hues() {
+        assert_eq!(hue(0.0).int_rgb_tup(), (255, 0, 0));
+        assert_eq!(hue(0.5).int_rgb_tup(), (0, 255, 255));
+        assert_eq!(hue(0.75).int_rgb_tup(), (127, 0, 255));
+    }
+
+    #[test]
+    fn test_wrapping() {
+        assert_eq!(hue(1.0).int_rgb_tup(), hue(0.0).int_rgb_tup());
+        assert_eq!(hue(1.5).int_rgb_tup(), hue(0.5).int_rgb_tup());
+        assert_eq!(hue(-0.25).int_rgb_tup(), hue(0.75).int_rgb_tup());
+    }
+}
@@ -8,6 +8,7 @@ pub mod players;
 pub mod sound;
 pub mod assets;
 pub mod animation;
+pub mod color;
 
 pub struct World<'a, S> {
     // Current time of the frame
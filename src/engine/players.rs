@@ -1,11 +1,13 @@
-use std::collections::{HashMap, HashSet};
-use std::time::Duration;
+use std::collections::HashSet;
+use std::path::PathBuf;
+use std::time::{Duration, Instant};
 
-use anyhow::Result;
+use anyhow::{Context, Result};
 use cgmath::InnerSpace;
 use futures::{StreamExt, task::Poll};
 use heapless::HistoryBuffer;
 use scarlet::color::RGBColor;
+use tokio::task::JoinHandle;
 use tokio::time::timeout;
 use tracing::{debug, error, instrument, warn};
 
@@ -23,6 +25,9 @@ pub struct Player {
     pub color: Animated<RGBColor>,
 
     failed: usize,
+
+    // Counted separately as reads succeeding each frame would otherwise hide a broken output path
+    failed_feedback: usize,
 }
 
 impl Player {
@@ -41,16 +46,11 @@ impl Player {
     }
 
     #[instrument(level = "trace", name = "Player::update", skip(self), fields(id = self.id()))]
-    async fn update(&mut self, duration: Duration) {
+    async fn update(&mut self, now: Instant, duration: Duration) {
         self.rumble.update(duration);
         self.color.update(duration);
 
-        self.controller.feedback(Feedback {
-            rgb: self.color.value().int_rgb_tup(),
-            rumble: self.rumble.value(),
-        });
-
-        let update = self.controller.update();
+        let update = self.controller.update(now);
         let update = timeout(Self::TIMEOUT, update);
 
         if let Err(err) = update.await
@@ -58,7 +58,7 @@ impl Player {
             .flatten() {
             warn!("Updating controller {} failed: {}", self.controller.id(), err);
             self.failed += 1;
-        } else {
+        } else if self.failed > 0 {
             // TODO: Do not reset immediately but require multiple successful before resetting
             // TODO: Report flaky devices
             self.failed = 0;
@@ -68,6 +68,28 @@ impl Player {
         self.acceleration.write((1.0 - self.controller.input().accelerometer.magnitude()).abs());
     }
 
+    #[instrument(level = "trace", name = "Player::flush", skip(self), fields(id = self.id()))]
+    async fn flush(&mut self, now: Instant) {
+        self.controller.feedback(Feedback {
+            rgb: self.color.value().int_rgb_tup(),
+            rumble: self.rumble.value(),
+        });
+
+        let flush = self.controller.flush(now);
+        let flush = timeout(Self::TIMEOUT, flush);
+
+        if let Err(err) = flush.await
+            .map_err(Into::into)
+            .flatten() {
+            warn!("Sending feedback to controller {} failed: {}", self.controller.id(), err);
+            self.failed_feedback += 1;
+        } else if self.failed_feedback > 0 {
+            // A failed write stays pending and is retried on next flush - so this is only reached
+            // after the feedback went out
+            self.failed_feedback = 0;
+        }
+    }
+
     pub fn controller(&self) -> &Controller {
         return &self.controller;
     }
@@ -84,6 +106,9 @@ impl Player {
 pub struct Players {
     players: Vec<Player>,
 
+    // Controllers currently opened in background
+    pending: Vec<(PathBuf, JoinHandle<Result<Controller>>)>,
+
     events: hid::Events,
 }
 
@@ -96,48 +121,82 @@ impl Players {
 
         let mut players = Self {
             players: Vec::new(),
+            pending: Vec::new(),
             events,
         };
 
         // Process all initial devices
         for device in devices {
-            players.add_device(device).await?;
+            players.add_device(device);
         }
 
         return Ok(players);
     }
 
     #[instrument(level = "trace", name = "Players::update", skip(self))]
-    pub async fn update(&mut self, duration: Duration) -> Result<()> {
-        // We limit this to a single event on each update cycle
-        if let Poll::Ready(Some(event)) = futures::poll(self.events.next()).await {
+    pub async fn update(&mut self, now: Instant, duration: Duration) -> Result<()> {
+        // Handle all hotplug events queued since the last update cycle
+        while let Poll::Ready(Some(event)) = futures::poll(self.events.next()).await {
             match event? {
                 hid::Event::Added(device) => {
-                    self.add_device(device).await?;
+                    self.add_device(device);
                 }
 
                 hid::Event::Removed(path) => {
                     debug!("Removed controller: {:?}", &path);
                     self.players.retain(|player| player.controller.path() != path);
+                    self.pending.retain(|(pending, task)| if *pending == path {
+                        task.abort();
+                        false
+                    } else {
+                        true
+                    });
                 }
             };
         }
 
+        // Pick up controllers which have been opened in the meantime
+        let mut i = 0;
+        while i < self.pending.len() {
+            if let Poll::Ready(result) = futures::poll!(&mut self.pending[i].1) {
+                let (path, _) = self.pending.swap_remove(i);
+                let controller = result
+                    .map_err(Into::into)
+                    .flatten()
+                    .with_context(|| format!("Failed to open controller: {:?}", path))?;
+                self.add_controller(controller);
+            } else {
+                i += 1;
+            }
+        }
+
         // Update all controllers
         futures::future::join_all(
             self.players.iter_mut()
-                .map(|player| player.update(duration))
+                .map(|player| player.update(now, duration))
         ).await;
 
         // Drop controllers with high error count
         for player in self.players
-            .drain_filter(|player| player.failed >= Self::MAX_FAILS) {
+            .drain_filter(|player| player.failed >= Self::MAX_FAILS || player.failed_feedback >= Self::MAX_FAILS) {
             error!("Dropping player {} because of to many errors", player.id());
         }
 
         return Ok(());
     }
 
+    /// Sends the feedback for all players to the controllers.
+    ///
+    /// This must be called after the game has been updated to make the feedback of the current frame
+    /// visible without waiting for the next one.
+    #[instrument(level = "trace", name = "Players::flush", skip(self))]
+    pub async fn flush(&mut self, now: Instant) {
+        futures::future::join_all(
+            self.players.iter_mut()
+                .map(|player| player.flush(now))
+        ).await;
+    }
+
     pub fn count(&self) -> usize {
         return self.players.len();
     }
@@ -169,11 +228,22 @@ impl Players {
         };
     }
 
-    async fn add_device(&mut self, device: hid::Device) -> Result<()> {
+    fn add_device(&mut self, device: hid::Device) {
+        // Opening a controller is expensive - keep the existing one if the device is already known
+        if self.players.iter().any(|player| player.controller.path() == device.path) ||
+            self.pending.iter().any(|(path, _)| *path == device.path) {
+            debug!("Controller already known: {:?}", device.path);
+            return;
+        }
+
         debug!("Added controller: {:?}", device.path);
 
-        let controller = Controller::new(&device.path).await?;
+        // Opening the controller takes a while - do this in background to not stall the other players
+        let task = tokio::spawn(Controller::new(device.path.clone()));
+        self.pending.push((device.path, task));
+    }
 
+    fn add_controller(&mut self, controller: Controller) {
         // Must ensure IDs are unique
         assert!(self.players.iter()
             .map(Player::id)
@@ -186,14 +256,14 @@ impl Players {
             rumble: Animated::idle(0),
             color: Animated::idle(RGBColor { r: 0.0, g: 0.0, b: 0.0 }),
             failed: 0,
+            failed_feedback: 0,
         });
-
-        return Ok(());
     }
 }
 
 pub struct PlayerData<D> {
-    data: HashMap<PlayerId, D>,
+    // There are only a handful of players - scanning a flat list is cheaper than hashing the ids
+    data: Vec<(PlayerId, D)>,
 }
 
 impl<D> PlayerData<D> {
@@ -205,12 +275,12 @@ impl<D> PlayerData<D> {
         return Self { data };
     }
 
-    pub fn init_with(data: HashMap<PlayerId, D>) -> Self {
-        return Self { data };
+    pub fn init_with(data: impl IntoIterator<Item=(PlayerId, D)>) -> Self {
+        return Self { data: data.into_iter().collect() };
     }
 
     pub fn new() -> Self {
-        return Self { data: HashMap::new() };
+        return Self { data: Vec::new() };
     }
 
     pub fn reset(&mut self) {
@@ -218,11 +288,15 @@ impl<D> PlayerData<D> {
     }
 
     pub fn get(&mut self, player: PlayerId) -> Option<&D> {
-        return self.data.get(&player);
+        return self.data.iter()
+            .find(|(id, _)| *id == player)
+            .map(|(_, data)| data);
     }
 
     pub fn get_mut(&mut self, player: PlayerId) -> Option<&mut D> {
-        return self.data.get_mut(&player);
+        return self.data.iter_mut()
+            .find(|(id, _)| *id == player)
+            .map(|(_, data)| data);
     }
 
     pub fn iter(&self) -> impl Iterator<Item=(PlayerId, &D)> {
@@ -236,11 +310,17 @@ impl<D> PlayerData<D> {
     }
 
     pub fn keys(&self) -> impl Iterator<Item=PlayerId> + '_ {
-        return self.data.keys().copied();
+        return self.data.iter()
+            .map(|(id, _)| *id);
     }
 
     pub fn remove(&mut self, player: PlayerId) -> bool {
-        return self.data.remove(&player).is_some();
+        if let Some(i) = self.data.iter().position(|(id, _)| *id == player) {
+            self.data.swap_remove(i);
+            return true;
+        }
+
+        return false;
     }
 
     pub fn len(&self) -> usize {
@@ -254,18 +334,15 @@ pub struct WithData<'a, D> {
 }
 
 impl<'a, D> WithData<'a, D> {
-    pub fn update(self, mut f: impl FnMut(&'a mut Player, &'a mut D) -> bool) {
-        self.data.data.retain(|id, data| {
-            if let Some(player) = self.players.get_mut(*id) {
-                // SAFETY: This is save because the underlying `self.iter` is guaranteed to yield unique
-                // serials and therefore this will never hand out two references to the same element
-                // from `self.data`.
-                let data: &'a mut D = unsafe { std::mem::transmute(data) };
-                let player: &'a mut Player = unsafe { std::mem::transmute(player) };
-                return f(player, data);
-            }
-
-            return false;
-        })
+    pub fn update(self, mut f: impl FnMut(&mut Player, &mut D) -> bool) {
+        let players = self.players;
+
+        // Drop data of players which are gone or have been rejected by the callback
+        self.data.data
+            .drain_filter(|(id, data)| match players.get_mut(*id) {
+                Some(player) => !f(player, data),
+                None => true,
+            })
+            .for_each(drop);
     }
 }
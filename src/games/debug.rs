@@ -1,7 +1,6 @@
 use std::time::Duration;
 
 use scarlet::color::RGBColor;
-use scarlet::colorpoint::ColorPoint;
 
 use crate::controller::Battery;
 use crate::engine::sound::Playback;
@@ -14,14 +13,20 @@ pub struct Debug {
 }
 
 pub fn battery_to_color(battery: Battery) -> RGBColor {
-    const COLOR_EMPTY: RGBColor = RGBColor { r: 1.0, g: 0.0, b: 0.0 };
-    const COLOR_FULL: RGBColor = RGBColor { r: 0.0, g: 1.0, b: 0.0 };
+    // Colors for the reported battery levels from empty (0.0) to almost full (0.8)
+    const COLOR_DRAINING: [RGBColor; 5] = [
+        RGBColor { r: 1.0, g: 0.0, b: 0.0 },
+        RGBColor { r: 0.8, g: 0.2, b: 0.0 },
+        RGBColor { r: 0.6, g: 0.4, b: 0.0 },
+        RGBColor { r: 0.4, g: 0.6, b: 0.0 },
+        RGBColor { r: 0.2, g: 0.8, b: 0.0 },
+    ];
     const COLOR_CHARGING: RGBColor = RGBColor { r: 0.0, g: 0.0, b: 1.0 };
     const COLOR_CHARGED: RGBColor = RGBColor { r: 0.0, g: 1.0, b: 1.0 };
     const COLOR_UNKNOWN: RGBColor = RGBColor { r: 0.3, g: 0.3, b: 0.3 };
 
     return match battery {
-        Battery::Draining(level) => ColorPoint::weighted_midpoint(COLOR_EMPTY, COLOR_FULL, level as f64),
+        Battery::Draining(level) => COLOR_DRAINING[((level * 5.0).round() as usize).min(COLOR_DRAINING.len() - 1)],
         Battery::Charging => COLOR_CHARGING,
         Battery::Charged => COLOR_CHARGED,
         Battery::Unknown => COLOR_UNKNOWN,
@@ -89,4 +94,31 @@ impl Game for Debug {
     fn kick_player(&mut self, _player: PlayerId, _world: &mut World) -> bool {
         return false;
     }
-}
\ No newline at end of file
+}
+#[cfg(test)]
+mod test {
+    use super::*;
+
+    fn rgb(color: RGBColor) -> (f64, f64, f64) {
+        return (color.r, color.g, color.b);
+    }
+
+    #[test]
+    fn test_battery_to_color_draining() {
+        assert_eq!(rgb(battery_to_color(Battery::Draining(0.0))), (1.0, 0.0, 0.0));
+        assert_eq!(rgb(battery_to_color(Battery::Draining(0.2))), (0.8, 0.2, 0.0));
+        assert_eq!(rgb(battery_to_color(Battery::Draining(0.4))), (0.6, 0.4, 0.0));
+        assert_eq!(rgb(battery_to_color(Battery::Draining(0.6))), (0.4, 0.6, 0.0));
+        assert_eq!(rgb(battery_to_color(Battery::Draining(0.8))), (0.2, 0.8, 0.0));
+
+        // Levels above the table saturate at the last entry
+        assert_eq!(rgb(battery_to_color(Battery::Draining(1.0))), (0.2, 0.8, 0.0));
+    }
+
+    #[test]
+    fn test_battery_to_color_other() {
+        assert_eq!(rgb(battery_to_color(Battery::Charging)), (0.0, 0.0, 1.0));
+        assert_eq!(rgb(battery_to_color(Battery::Charged)), (0.0, 1.0, 1.0));
+        assert_eq!(rgb(battery_to_color(Battery::Unknown)), (0.3, 0.3, 0.3));
+    }
+}
@@ -3,10 +3,10 @@ use std::ops::Range;
 use std::time::{Duration, Instant};
 
 use rand::Rng;
-use scarlet::color::{Color, RGBColor};
-use scarlet::colors::HSVColor;
+use scarlet::color::RGBColor;
 
 use crate::engine::animation::Animated;
+use crate::engine::color;
 use crate::engine::players::{PlayerData, PlayerId};
 use crate::engine::sound::Playback;
 use crate::games::{Game, GameData, Session};
@@ -21,11 +21,7 @@ pub struct Player {
 
 impl PlayerColor for Player {
     fn color(&self) -> RGBColor {
-        return HSVColor {
-            h: self.hue * 360.0 % 360.0,
-            s: 1.0,
-            v: 1.0,
-        }.convert::<RGBColor>();
+        return color::hue(self.hue);
     }
 }
 
@@ -130,12 +126,13 @@ impl Game for Joust {
         self.music.speed(self.music_speed.value());
 
         // Slowly rotate and re-balance player colors
+        let hue_base = self.hue_base + session.age(world.now).as_secs_f64() * Self::HUE_ROTATION_SPEED;
+        let hue_step = 1.0 / world.players.count() as f64;
+        let hue_adoption = Self::HUE_ADOPTION_SPEED * duration.as_secs_f64();
         for (i, (_, data)) in self.data.iter_mut().enumerate() {
-            let target_hue = self.hue_base
-                + session.age(world.now).as_secs_f64() * Self::HUE_ROTATION_SPEED
-                + (1.0 / world.players.count() as f64) * i as f64;
+            let target_hue = hue_base + hue_step * i as f64;
             let delta_hue = target_hue - data.hue;
-            data.hue += delta_hue.signum() * (Self::HUE_ADOPTION_SPEED * duration.as_secs_f64()).min(delta_hue.abs());
+            data.hue += delta_hue.signum() * hue_adoption.min(delta_hue.abs());
         }
 
         // Update players
@@ -153,21 +150,25 @@ impl Game for Joust {
                 return false;
             }
 
-            // Update color reflecting players acceleration
-            player.color.set(HSVColor {
-                h: data.hue * 360.0 % 360.0,
-                s: 1.0,
-                v: 1.0 - f32::sqrt(accel) as f64,
-            }.convert::<RGBColor>());
+            // Update color reflecting players acceleration by dimming the players color
+            let color = data.color();
+            let value = 1.0 - f32::sqrt(accel) as f64;
+            player.color.set(RGBColor {
+                r: color.r * value,
+                g: color.g * value,
+                b: color.b * value,
+            });
 
             return true;
         });
 
-        if self.data.len() == 1 {
+        let alive = self.data.len();
+
+        if alive == 1 {
             return Some(State::Celebration(Celebration::new(self.data.keys().collect(), world)));
         }
 
-        if self.data.len() == 0 {
+        if alive == 0 {
             // Got a draw - everybody is winner
             return Some(State::Celebration(Celebration::new(world.players.keys().collect(), world)));
         }
@@ -208,12 +209,11 @@ impl GameData for Joust {
             .enumerate()
             .map(|(i, id)| (id, Player {
                 hue: hue_base + hue_step * i as f64,
-            }))
-            .collect());
+            })));
 
         return Self {
             data: players,
-            speed: (Speed::NORMAL, Instant::now() + Self::PACING_REGULAR_DUR.end),
+            speed: (Speed::NORMAL, world.now + Self::PACING_REGULAR_DUR.end),
             music,
             music_speed: Animated::idle(Speed::NORMAL.music()),
             threshold: Animated::idle(Speed::NORMAL.threshold()),
@@ -3,7 +3,7 @@
 #![feature(result_flattening)]
 #![feature(drain_filter)]
 
-use std::time::Instant;
+use std::time::{Duration, Instant};
 
 use anyhow::{Context, Result};
 use futures::task::Poll;
@@ -13,7 +13,6 @@ use crate::engine::players::Players;
 use crate::engine::sound::Sound;
 use crate::engine::World;
 use crate::state::{Settings, State};
-use crate::web::StateDTO;
 
 pub mod controller;
 pub mod engine;
@@ -22,6 +21,9 @@ pub mod web;
 pub mod meta;
 pub mod state;
 
+// Minimum duration of a frame - keeps the loop from spinning if there is nothing to wait for
+const FRAME_TIME: Duration = Duration::from_millis(4);
+
 #[tokio::main]
 async fn main() -> Result<()> {
     tracing_subscriber::fmt()
@@ -62,7 +64,7 @@ async fn main() -> Result<()> {
         };
 
         // Update controller information
-        players.update(duration).await
+        players.update(now, duration).await
             .context("Failed to update players")?;
 
         let mut world = World {
@@ -79,15 +81,21 @@ async fn main() -> Result<()> {
         // Play the game
         state = state.update(&mut world, duration);
 
+        // Send feedback resulting from this frame
+        players.flush(now).await;
+
         // Publish updated status info
-        info.publish(StateDTO {
-            mode: settings.game_mode.into(),
-            state: (&state).into(),
-            devices: players.iter()
-                .map(|player| player.controller().into())
-                .collect(),
+        info.publish(|info| {
+            info.mode = settings.game_mode.into();
+            info.state.assign(&state);
+            info.devices.clear();
+            info.devices.extend(players.iter()
+                .map(|player| player.controller().into()));
         });
 
         last = now;
+
+        // Wait for the remainder of the frame
+        tokio::time::sleep_until((now + FRAME_TIME).into()).await;
     }
 }
@@ -2,11 +2,11 @@ use std::collections::HashSet;
 use std::time::Duration;
 
 use rand::Rng;
-use scarlet::color::{Color, RGBColor};
-use scarlet::colors::HSVColor;
+use rand::seq::SliceRandom;
 use tracing::debug;
 
 use crate::{keyframe, keyframes};
+use crate::engine::color;
 use crate::engine::players::{PlayerData, PlayerId};
 use crate::state::{State, World};
 
@@ -17,6 +17,9 @@ pub struct Celebration {
 impl Celebration {
     const TIME: Duration = Duration::from_secs(10);
 
+    // Colors to pick fireworks from - computed at compile time instead of converting each spark
+    const FIREWORKS: [(u8, u8, u8); 50] = color::rainbow();
+
     pub fn new(winners: HashSet<PlayerId>, world: &mut World) -> Self {
         debug!("Celebrating winners: {:?}", winners);
 
@@ -46,11 +49,8 @@ impl Celebration {
                     }
 
                     let duration = Duration::from_millis(rand::thread_rng().gen_range(100..700));
-                    let color = HSVColor {
-                        h: rand::thread_rng().gen_range(0.0..360.0),
-                        s: 1.0,
-                        v: 1.0,
-                    }.convert::<RGBColor>();
+                    let color = *Self::FIREWORKS.choose(&mut rand::thread_rng())
+                        .expect("Fireworks palette is empty");
 
                     elapsed += duration;
 
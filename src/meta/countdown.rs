@@ -26,6 +26,8 @@ impl Countdown {
 
         // Short initial buzz for all players
         world.players.with_data(game.data()).update(|player, data| {
+            let color = data.color();
+
             player.rumble.animate(keyframes![
                 0.0 => 127,
                 0.1 => 0,
@@ -34,16 +36,16 @@ impl Countdown {
             player.color.animate(keyframes![
                 0.0 => { (0, 0, 0) },
 
-                0.75 => { data.color() } @ end,
+                0.75 => { color } @ end,
 
                 0.10 => { (0, 0, 0) } @ linear,
-                0.65 => { data.color() } @ end,
+                0.65 => { color } @ end,
 
                 0.20 => { (0, 0, 0) } @ linear,
-                0.55 => { data.color() } @ end,
+                0.55 => { color } @ end,
 
                 0.30 => { (0, 0, 0) } @ linear,
-                0.45 => { data.color() } @ end,
+                0.45 => { color } @ end,
             ]);
 
             return true;
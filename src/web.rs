@@ -73,6 +73,21 @@ impl From<&State> for GameStateDTO {
     }
 }
 
+impl GameStateDTO {
+    /// Updates this to reflect the given state while re-using existing allocations
+    pub fn assign(&mut self, state: &State) {
+        match (self, state) {
+            (Self::Waiting { ready }, State::Lobby(lobby)) => {
+                ready.clone_from(lobby.ready());
+            }
+
+            (this, state) => {
+                *this = state.into();
+            }
+        }
+    }
+}
+
 #[derive(Serialize, Clone, PartialEq)]
 pub struct ControllerInfoDTO {
     pub address: Address,
@@ -117,12 +132,19 @@ impl Default for StateDTO {
     }
 }
 
-pub struct InfoPublisher(watch::Sender<StateDTO>);
+pub struct InfoPublisher {
+    sender: watch::Sender<StateDTO>,
+
+    // Buffer for collecting the info on each frame - only cloned if the info has changed
+    info: StateDTO,
+}
 
 impl InfoPublisher {
-    pub fn publish(&mut self, info: StateDTO) {
-        if *self.0.borrow() != info {
-            self.0.send_replace(info);
+    pub fn publish(&mut self, update: impl FnOnce(&mut StateDTO)) {
+        update(&mut self.info);
+
+        if *self.sender.borrow() != self.info {
+            self.sender.send_replace(self.info.clone());
         }
     }
 }
@@ -234,7 +256,10 @@ pub fn serve() -> Result<(impl Future<Output=()>, mpsc::Receiver<Actions>, InfoP
     let (stub, requests) = Stub::create();
 
     let (info_publisher, info_watch) = watch::channel(StateDTO::default());
-    let info_publisher = InfoPublisher(info_publisher);
+    let info_publisher = InfoPublisher {
+        sender: info_publisher,
+        info: StateDTO::default(),
+    };
 
     let api = mode_set(stub.clone())
         .or(game_start(stub.clone()))